@@ -1,4 +1,4 @@
-import os
+import subprocess
 
 
 solver_path = '/usr/local/bin/approxmc'
@@ -9,14 +9,10 @@ __all__ = ['count']
 
 def count(cnf_file: str, epsilon=0.8, delta=0.2):
 
-    temp_file = '.{}.tmp'.format(cnf_file)
+    proc = subprocess.run([solver_path, '--epsilon', str(epsilon), '--delta', str(delta), cnf_file],
+                          stdout=subprocess.PIPE, universal_newlines=True)
 
-    os.system('{0} --epsilon {2} --delta {3} {1} > {4}'.format(solver_path, cnf_file, epsilon, delta, temp_file))
-
-    with open(temp_file, 'r') as f:
-        lines = f.readlines()
-        print("".join(lines[-2:])[:-1])
-
-    os.remove(temp_file)
+    # Last two lines of the solver log hold the count
+    print('\n'.join(proc.stdout.splitlines()[-2:]))
 
     return True
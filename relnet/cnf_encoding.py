@@ -1,3 +1,5 @@
+import numpy as np
+
 from relnet.graph_parser import Graph
 from relnet.cnf_parser import CNF
 from relnet.weighted_to_unweighted import weighted2unweighted
@@ -39,39 +41,44 @@ def krelnet(g: Graph):
 
     # (II) SAT encoding
     # initializations
-    clauses = []
     ind = []
 
     # Size of IS
     size_is = g.m
 
+    # Node u is variable u + offset
+    offset = 1 + size_is
+    E = np.array(g.E, dtype=np.int32).reshape(-1, 2) + offset
+    K = np.array(g.K, dtype=np.int32) + offset
+
     # (II-a) CONSTRAINTS
 
     # Node marking constraints
-    if len(g.K) == 2:
-        clauses.append([g.K[0] + 1 + size_is])
-        clauses.append([-(g.K[1] + 1 + size_is)])
+    if len(K) == 2:
+        marking = [K[:1], -K[1:]]
     else:
-        clauses.append([(i + 1 + size_is) for i in g.K])
-        clauses.append([-(i + 1 + size_is) for i in g.K])
-
-    # Transitivity constraint
-    for i in range(g.m):
-        # unpack nodes
-        u, v = g.E[i]
-        u += 1 + size_is
-        v += 1 + size_is
-
-        # edge
-        uv = i + 1
-
-        # Push clauses
-        clauses.append([-u, -uv, v])
-        clauses.append([u, -uv, -v])
+        marking = [K, -K]
+
+    # Transitivity constraint: edge uv is variable i + 1, clauses [-u, -uv, v] and [u, -uv, -v]
+    uv = np.arange(1, size_is + 1, dtype=np.int32)
+    transitivity = np.empty((size_is, 2, 3), dtype=np.int32)
+    transitivity[:, 0, 0] = -E[:, 0]
+    transitivity[:, 0, 1] = -uv
+    transitivity[:, 0, 2] = E[:, 1]
+    transitivity[:, 1, 0] = E[:, 0]
+    transitivity[:, 1, 1] = -uv
+    transitivity[:, 1, 2] = -E[:, 1]
+
+    # CSR layout: two node marking clauses followed by 2 * size_is clauses of length 3
+    data = np.concatenate(marking + [transitivity.ravel()])
+    start = len(marking[0]) + len(marking[1])
+    offsets = np.concatenate([[0, len(marking[0])], start + 3 * np.arange(2 * size_is + 1)])
 
     # (II-b) INDEPENDENT SUPPORT
 
     ind += list(range(1, size_is + 1))
 
-    return CNF(clauses, ind)
+    # Largest variable is the largest node appearing in the clauses
+    n = int(max(E.max() if E.size > 0 else 0, K.max() if K.size > 0 else 0))
 
+    return CNF.from_csr(data, offsets, ind, n=n)
@@ -1,37 +1,110 @@
-from itertools import product
-from typing import List
+import warnings
+from itertools import chain
+from typing import List, Tuple
+
+import numpy as np
 
 __all__ = ['CNF', 'parse_cnf']
 
 Clause = List[int]
 
+# Most (assignment, literal) pairs `CNF.evaluate_batch` holds at once, and literals in its first clause chunk;
+# `CNF.phi` and `CNF.enumerate` also size their batches of assignments from the budget
+_ELEMENT_BUDGET = 1 << 20
+_FIRST_CHUNK = 1 << 6
+
 
 class CNF:
     """
     Base class for CNF sat formulas.
 
+    Clauses are stored in CSR layout: a flat int32 array of literals and an array of offsets such that clause `j`
+    is ``data[offsets[j]:offsets[j + 1]]``. Build from that layout with :meth:`CNF.from_csr`.
+
     """
 
-    def __init__(self, clauses: List[Clause], ind: List[int] = []):
+    def __init__(self, clauses: List[Clause], ind: List[int] = [], n: int = None):
         """
         Base class for CNF formulas
 
         Args:
             clauses: list of clauses
             ind:  Unquantified variables (ApproxMC)
+            n: Number of variables. Computed from `clauses` if not given.
         """
         # Standard
-        self.clauses = clauses
-        self.n = max(*(var if var > 0 else -var for clause in clauses for var in clause))
-        self.m = len(clauses)
+        lengths = np.fromiter(map(len, clauses), dtype=np.int64, count=len(clauses))
+        offsets = np.zeros(len(clauses) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        data = np.fromiter(chain.from_iterable(clauses), dtype=np.int32, count=int(offsets[-1]))
+        self._set_csr(data, offsets, n)
 
         # ApproxMC related
         self.ind = ind
 
+    @classmethod
+    def from_csr(cls, data: np.ndarray, offsets: np.ndarray, ind: List[int] = [], n: int = None) -> 'CNF':
+        """ Builds a CNF from clauses in CSR layout.
+
+        Args:
+            data: flat array of literals
+            offsets: clause `j` is ``data[offsets[j]:offsets[j + 1]]``
+            ind:  Unquantified variables (ApproxMC)
+            n: Number of variables. Computed from `data` if not given.
+
+        Returns:
+            CNF
+
+        Examples:
+
+            The formula [(x1 or not(x2)) and (not(x1) or x2)] is:
+
+            >>> cnf = CNF.from_csr([1, -2, -1, 2], [0, 2, 4])
+            >>> cnf.clauses
+            ((1, -2), (-1, 2))
+
+        """
+        data = np.asarray(data, dtype=np.int32)
+        offsets = np.asarray(offsets, dtype=np.int64)
+
+        if len(offsets) == 0 or offsets[0] != 0 or offsets[-1] != len(data) or (np.diff(offsets) < 0).any():
+            raise ValueError('offsets must start at 0, never decrease and end at len(data)')
+
+        cnf = cls([], ind)
+        cnf._set_csr(data, offsets, n)
+
+        return cnf
+
+    def _set_csr(self, data, offsets, n):
+        self._data = data
+        self._offs = offsets
+        if n is None:
+            n = int(np.abs(data).max()) if data.size > 0 else 0
+        self.n = n
+        self.m = len(offsets) - 1
+
+        # Literal arrays used by `evaluate_batch`, see `_literals`
+        self._lits = None
+
+    @property
+    def clauses(self) -> Tuple[Tuple[int, ...], ...]:
+        """ Clauses as a read-only tuple of tuples; use :meth:`add_clause` to add clauses. """
+        data = self._data.tolist()
+        offs = self._offs.tolist()
+        return tuple(tuple(data[a:b]) for a, b in zip(offs, offs[1:]))
+
     def add_clause(self, clause: Clause):
-        self.clauses.append(clause)
+        self._data = np.concatenate([self._data, np.asarray(clause, dtype=np.int32)])
+        self._offs = np.append(self._offs, len(self._data))
+        self._lits = None
         self.m += 1
 
+    def _literals(self):
+        # Variable index and sign of every literal, and whether some clause is empty, cached until the clauses change
+        if self._lits is None:
+            self._lits = np.abs(self._data) - 1, self._data < 0, bool((np.diff(self._offs) == 0).any())
+        return self._lits
+
     def evaluate(self, X: List[int]):
         """ Evaluates CNF on assignment X.
 
@@ -60,38 +133,82 @@ class CNF:
 
         """
 
-        for clause in self.clauses:
+        return bool(self.evaluate_batch(np.asarray(X, dtype=np.bool_)[np.newaxis])[0])
 
-            clause_true = False
+    def evaluate_batch(self, Xs: np.ndarray) -> np.ndarray:
+        """ Evaluates CNF on every row of Xs.
 
-            for var in clause:
+        Args:
+            Xs: (B, n) array of assignments of boolean variables.
 
-                if var < 0 and not X[-var - 1]:
-                    clause_true = True
-                    break
+        Returns:
+            np.ndarray: Boolean array of length B, True where the CNF evaluates to True.
 
-                if var > 0 and X[var - 1]:
-                    clause_true = True
-                    break
+        """
 
-            if not clause_true:
-                return False
+        Xs = np.asarray(Xs, dtype=np.bool_)
+        offs = self._offs
+        idx, neg, has_empty = self._literals()
+        result = np.zeros(len(Xs), dtype=np.bool_)
 
-        return True
+        # An empty clause is false under every assignment
+        if has_empty:
+            return result
+
+        # Rows not falsified by the clauses seen so far; clause chunks double in size up to the element budget
+        rows = np.arange(len(Xs))
+        j = 0
+        chunk = _FIRST_CHUNK
+
+        while j < self.m and len(rows) > 0:
+            size = max(1, min(chunk, _ELEMENT_BUDGET // len(rows)))
+            j_end = min(max(j + 1, int(np.searchsorted(offs, offs[j] + size, side='right')) - 1), self.m)
+            a, b = offs[j], offs[j_end]
+
+            # Truth value of each literal: the variable's value, flipped for negative literals
+            lit_true = Xs[np.ix_(rows, idx[a:b])] ^ neg[a:b]
+
+            # A clause is true if it has at least one true literal
+            clause_true = np.logical_or.reduceat(lit_true, offs[j:j_end] - a, axis=1)
+            rows = rows[clause_true.all(axis=1)]
+
+            j = j_end
+            chunk *= 2
+
+        result[rows] = True
+
+        return result
 
     def phi(self, X: List[int]):
 
-        if len(self.ind) == 0:
+        ind_len = len(self.ind)
+
+        if ind_len == 0:
 
             return self.evaluate(X)
 
         else:
 
-            for s in product([0, 1], repeat=self.n - len(self.ind)):
-
-                if self.evaluate(X + s):
+            # Try the unquantified variables a batch of assignments at a time, doubling the batch up to the budget
+            X = np.asarray(X, dtype=np.bool_)
+            k = self.n - ind_len
+            total = 2 ** k
+            evaluate_batch = self.evaluate_batch
+            max_batch = max(1, _ELEMENT_BUDGET // max(self.n, 1))
+            start = 0
+            batch = 1
+
+            while start < total:
+                stop = min(start + batch, total)
+                S = _truth_table(k, start, stop)
+                Xs = np.concatenate([np.broadcast_to(X, (len(S), len(X))), S], axis=1)
+
+                if evaluate_batch(Xs).any():
                     return True
 
+                start = stop
+                batch = min(2 * batch, max_batch)
+
         return False
 
     def prob(self, X: List[int]):
@@ -113,15 +230,12 @@ class CNF:
 
         """
 
-        if len(self.ind) == 0:
+        k = self.n if len(self.ind) == 0 else len(self.ind)
+        batch = max(1, _ELEMENT_BUDGET // max(k, 1))
 
-            for X in product([0, 1], repeat=self.n):
-                yield X
-
-        else:
-
-            for X in product([0, 1], repeat=len(self.ind)):
-                yield X
+        for start in range(0, 2 ** k, batch):
+            for X in _truth_table(k, start, min(start + batch, 2 ** k)).tolist():
+                yield tuple(X)
 
     def write(self, out_file: str):
         """
@@ -150,24 +264,36 @@ class CNF:
 
         """
 
-        with open(out_file, 'w') as f:
-            # p line
-            f.write('p cnf %d %d\n' % (self.n, self.m))
+        ind = self.ind
+        m = self.m
+
+        # p line
+        lines = ['p cnf %d %d\n' % (self.n, m)]
 
-            # Independent suport
-            if len(self.ind) > 0:
-                f.write(_ind_set(self.ind))
+        # Independent suport
+        if len(ind) > 0:
+            lines.append(_ind_set(ind))
 
-            # Constraints
-            for clause in self.clauses:
-                f.write(' '.join([str(i) for i in clause]) + ' 0\n')
+        # Constraints, formatted one run of equal-length clauses at a time
+        data = self._data.tolist()
+        offs = self._offs.tolist()
+        lengths = np.diff(self._offs)
+        runs = [0] + (np.flatnonzero(np.diff(lengths)) + 1).tolist() + [m]
+        for a, b in zip(runs, runs[1:]):
+            if a < b:
+                clause_fmt = ' '.join(['%d'] * int(lengths[a])) + ' 0\n'
+                lines.append((clause_fmt * (b - a)) % tuple(data[offs[a]:offs[b]]))
+
+        with open(out_file, 'w', buffering=1 << 20) as f:
+            f.write(''.join(lines))
 
         return True
 
     def __eq__(self, other):
 
         if type(self) is type(other):
-            return self.__dict__ == self.__dict__
+            return (self.n == other.n and list(self.ind) == list(other.ind)
+                    and np.array_equal(self._data, other._data) and np.array_equal(self._offs, other._offs))
         else:
             return False
 
@@ -208,7 +334,7 @@ def parse_cnf(in_file: str):
     f.close()
 
     # Initializations
-    clauses = []
+    clause_lines = []
     ind = []
 
     # Loop for each line
@@ -230,22 +356,46 @@ def parse_cnf(in_file: str):
 
             pass
 
+        elif line.startswith('%'):  # SATLIB end of formula, followed by a trailing '0'
+
+            break
+
         else:
 
-            clauses.append([int(var) for var in line.strip().split()[:-1]])
+            clause_lines.append(line)
+
+    # Parse all clauses at once; each clause is terminated by a 0
+    text = ''.join(clause_lines)
+    try:
+        # numpy 2 raises on a token that is not an integer, numpy 1.18+ only warns and drops the rest
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', DeprecationWarning)
+            tokens = np.fromstring(text, dtype=np.int64, sep=' ')
+    except (ValueError, DeprecationWarning):
+        # Slower path whose error names the offending token
+        tokens = np.array(text.split(), dtype=np.int64)
+
+    # Literals are stored as int32 (out of range values saturate at the int64 limits above)
+    if len(tokens) > 0 and (tokens.max() >= 2 ** 31 or tokens.min() <= -2 ** 31):
+        raise ValueError('literal out of range in "{}"'.format(in_file))
+
+    if len(tokens) > 0 and tokens[-1] != 0:
+        raise ValueError('last clause in "{}" is not terminated by 0'.format(in_file))
+
+    tokens = tokens.astype(np.int32)
+    ends = np.flatnonzero(tokens == 0)
+    data = tokens[tokens != 0]
+    offsets = np.concatenate([[0], ends - np.arange(len(ends))])
+
+    return CNF.from_csr(data, offsets, ind)
+
 
-    return CNF(clauses, ind)
+def _truth_table(k, start, stop):
+    # Rows start, ..., stop - 1 of the truth table over k variables, in itertools.product order
+    rows = np.arange(start, stop, dtype=np.int64)[:, np.newaxis]
+    return ((rows >> np.arange(k - 1, -1, -1)) & 1).astype(np.uint8)
 
 
 def _ind_set(ind_list):
-    # signals sampling set to ApproxMC
-    s = 'c ind '
-    counter = 0
-    for i in ind_list:
-        if counter == 10:
-            counter = 0
-            s += '0\nc ind '
-        counter += 1
-        s += '%s ' % str(i)
-    s += '0\n'
-    return s
+    # signals sampling set to ApproxMC, 10 variables per line
+    return ''.join('c ind %s 0\n' % ' '.join(map(str, ind_list[i:i + 10])) for i in range(0, len(ind_list), 10))
@@ -1,5 +1,7 @@
 from typing import List, Tuple
 
+import numpy as np
+
 
 class Graph:
     """
@@ -63,17 +65,19 @@ class Graph:
 
             """
 
-        # Open file and write lines
-        with open(out_file, 'w') as f:
-            # Problem type
-            f.write("p g\n")
+        # Problem type
+        lines = ["p g\n"]
 
-            # Terminals
-            f.write("T " + " ".join([str(i + 1) for i in self.K]) + "\n")
+        # Terminals
+        lines.append("T " + " ".join([str(i + 1) for i in self.K]) + "\n")
+
+        # Edges (np.savetxt also formats row by row in Python and is slower than this)
+        up = (1 - np.array(self.P, dtype=np.float64)).tolist()
+        lines.extend("e %d %d %.12f\n" % (i + 1, j + 1, q) for (i, j), q in zip(self.E, up))
 
-            # Edges
-            for (i, j), p in zip(self.E, self.P):
-                f.writelines("e %d %d %.12f\n" % (i + 1, j + 1, 1 - p))
+        # Open file and write lines
+        with open(out_file, 'w', buffering=1 << 20) as f:
+            f.write("".join(lines))
 
         return True
 
@@ -127,37 +131,41 @@ def parse_graph(in_file: str) -> Graph:
 
     """
     # Initialize lists
-    V = []
+    V = set()
     K = []
     E = []
-    P = []
+    up = []
 
-    # Open file and read lines
-    f = open(in_file, 'r')
-    lines = f.readlines()
-    f.close()
+    # Single pass over the file, dispatching on the line tag
+    with open(in_file, 'r') as f:
+        for fields in map(str.split, f):
 
-    # Loop for each line
-    for line in lines:
+            if not fields:
+                continue
 
-        # Problem type
-        if line.startswith('p '):
-            fields = line.strip().split(' ')[1::]
-            assert (fields[0] == 'g')  # Instance file is not a Graph
+            tag = fields[0]
 
-        # Add edge data
-        elif line.startswith('e '):
-            fields = line.strip().split(' ')[1::]
-            head, tail = int(fields[0]) - 1, int(fields[1]) - 1
-            E.append((head, tail))
-            P.append(1 - float(fields[2]))
+            # Add edge data
+            if tag == 'e':
+                head, tail = int(fields[1]) - 1, int(fields[2]) - 1
+                E.append((head, tail))
+                V.add(head)
+                V.add(tail)
+                up.append(float(fields[3]))
 
-        # Terminals
-        elif line.startswith('T '):
-            K.extend([int(i) - 1 for i in line.strip().split(' ')[1::]])
+            # Terminals
+            elif tag == 'T':
+                K.extend([int(i) - 1 for i in fields[1:]])
+
+            # Problem type
+            elif tag == 'p':
+                assert (fields[1] == 'g')  # Instance file is not a Graph
+
+    # Edge failure probabilities from the "up" probabilities in the file
+    P = (1 - np.array(up, dtype=np.float64)).tolist()
 
     # List of vertices
-    V.extend(list(set([node for e in E for node in e])))
+    V = sorted(V)
 
     # Graph
     g = Graph(V, K, E, P)
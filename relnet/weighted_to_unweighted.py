@@ -1,10 +1,16 @@
+from itertools import chain, islice
+from math import frexp
 from typing import List, Union
 
-from numpy import isclose
+import numpy as np
+
 from relnet.graph_parser import Graph
 
 __all__ = ['weighted2unweighted']
 
+# 2 ** -i for every bit position of a positive double (the smallest one is 2 ** -1074)
+_NEG_POW2 = tuple(2.0 ** -i for i in range(1075))
+
 
 def weighted2unweighted(g: Graph) -> Graph:
     """ Transforms weighted graph `g` into unweighted graph `ug`.
@@ -18,53 +24,88 @@ def weighted2unweighted(g: Graph) -> Graph:
         ug: Unweighted graph
 
     """
-    vertex_counter = g.n
-    E_new = []
-    P_new = []
-
-    for i in range(g.m):
-        if g.P[i] > 0: # down probability greater than zero
-            b = float2bin(1 - g.P[i])
-        elif g.P[i] == 0: # down probability equals zero
-            b = [1]
-        head, tail = g.E[i]
-        e_new, vertex_counter = _weighted_edge(b, head, tail, vertex_counter)
-        if g.P[i] > 0: # down probability greater than zero
-            P_new.extend([0.5] * len(e_new))
-        elif g.P[i] == 0: # down probability equals zero
-            P_new.extend([1.0] * len(e_new))
-        E_new.extend(e_new)
+    # Bit strings of the edge "up" probabilities
+    P = np.array(g.P, dtype=np.float64)
+    down = P > 0  # down probability greater than zero
+    bits = [float2bin(q) if d else [True] for q, d in zip((1 - P).tolist(), down.tolist())]
+    lengths = np.fromiter(map(len, bits), dtype=np.int64, count=g.m)
+    b = np.fromiter(chain.from_iterable(bits), dtype=np.bool_, count=int(lengths.sum()))
+
+    E = np.array(g.E, dtype=np.int64).reshape(-1, 2)
+
+    if g.m > 0 and E[:, 1].max() > g.n:
+        # New vertices may collide with a tail: expand edge by edge
+        vertex_counter = g.n
+        E_new = []
+        for i in range(g.m):
+            head, tail = g.E[i]
+            e_new, vertex_counter = _weighted_edge(bits[i], head, tail, vertex_counter)
+            E_new.extend(e_new)
+    else:
+        E_new, vertex_counter = _weighted_edges(b, lengths, E, g.n)
+
+    # down probability greater than zero splits into fair edges
+    P_new = np.repeat(np.where(down, 0.5, 1.0), lengths).tolist()
 
     V_new = list(range(vertex_counter))
-    # P_new = [0.5] * len(E_new)
     ug = Graph(V_new, g.K, E_new, P_new)
 
     return ug
 
 
+def _weighted_edges(b, lengths, E, vertex_counter):
+    """Vectorized :func:`_weighted_edge` over all edges, for tails that never collide with new vertices.
+
+    Args:
+        b: concatenated bit strings of all edges
+        lengths: length of the bit string of each edge
+        E: edges as an (m, 2) array
+        vertex_counter: last vertex id in use
+
+    Returns:
+        Tuple of new edges and last vertex id in use.
+    """
+    edge = np.repeat(np.arange(len(E)), lengths)
+    starts = np.cumsum(lengths) - lengths
+
+    # Each zero bit allocates a new vertex
+    zeros = ~b
+    allocated = np.cumsum(zeros)
+    allocated_before = allocated[starts] - zeros[starts]
+
+    # z[k] in _weighted_edge: the last allocated vertex, or the head if none yet
+    z = np.where(allocated > allocated_before[edge], vertex_counter + allocated, E[edge, 0])
+    z_prev = np.empty_like(z)
+    z_prev[1:] = z[:-1]
+    z_prev[starts] = E[:, 0]
+
+    heads = z_prev
+    tails = np.where(b, E[edge, 1], z)
+
+    E_new = list(zip(heads.tolist(), tails.tolist()))
+
+    return E_new, vertex_counter + int(zeros.sum())
+
+
 def _weighted_edge(b, head=0, tail=1, vertex_counter=0):
     """Details as in paper [PDMV-2019]"""
-    # Parameters
-    z = [head]
-    for bit in b:
-        if bit == 0:
+    # Edge k joins z[k - 1] to the tail if bit k is set, otherwise to a new vertex z[k]
+    e = [None] * len(b)
+    z = head
+    for k, bit in enumerate(b):
+        if bit:
+            e[k] = (z, tail)
+
+        else:
             vertex_counter += 1
 
             if vertex_counter == tail:
                 vertex_counter += 1
 
-            z.append(vertex_counter)
+            e[k] = (z, vertex_counter)
+            z = vertex_counter
 
-        else:
-            z.append(z[-1])
-
-    def _eta(k):
-        if b[k - 1]:
-            return z[k - 1], tail
-        else:
-            return z[k - 1], z[k]
-
-    return [_eta(k) for k in range(1, len(b) + 1)], vertex_counter
+    return e, vertex_counter
 
 
 def float2bin(p: float, min_bits: int = 10, max_bits: int = 20, relative_error_tol=1e-02) -> List[bool]:
@@ -110,13 +151,22 @@ def float2bin(p: float, min_bits: int = 10, max_bits: int = 20, relative_error_t
     i = 1
     original_p = 1 - p
 
-    while p != 0 or i > max_bits:
+    # Exact binary expansion of p: p == mantissa * 2 ** -shift
+    m, e = frexp(p)
+    mantissa = int(m * 2 ** 53)
+    shift = 53 - e
+
+    # Running value of bin2float(b)
+    acc = 0.0
+
+    while mantissa != 0 or i > max_bits:
         if i > min_bits:
-            if isclose(1 - bin2float(b), original_p, rtol=relative_error_tol, atol=0):
+            if abs(1 - acc - original_p) <= relative_error_tol * original_p:
                 break
-        if p >= 2 ** -i:
+        if i <= shift and mantissa >> (shift - i) & 1:
             b.append(True)
-            p -= 2 ** -i
+            mantissa ^= 1 << (shift - i)
+            acc += _NEG_POW2[i]
         else:
             b.append(False)
 
@@ -136,9 +186,9 @@ def bin2float(q) -> float:
 
     """
 
-    n = len(q)
+    # Bit i of q weighs 2 ** -(i + 1); positions past the table are below float resolution
     p = 0
-    for i in range(n):
-        p += q[i] * 2 ** -(i + 1)
+    for bit, weight in zip(q, islice(_NEG_POW2, 1, None)):
+        p += bit * weight
 
     return p
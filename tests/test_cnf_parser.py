@@ -0,0 +1,97 @@
+import os
+import random
+import tempfile
+import tracemalloc
+import unittest
+from itertools import product
+
+from relnet.cnf_parser import CNF, parse_cnf
+
+
+def _random_3cnf(n, m, plant=None, seed=0):
+    # Random 3-CNF; with `plant`, every clause is satisfied by that assignment
+    rng = random.Random(seed)
+    clauses = []
+    for _ in range(m):
+        clause = [rng.choice([-1, 1]) * rng.randint(1, n) for _ in range(3)]
+        if plant is not None:
+            var = abs(clause[0])
+            clause[0] = var if plant[var - 1] else -var
+        clauses.append(clause)
+    return clauses
+
+
+def _brute_phi(clauses, n, X):
+    # Reference: some assignment of the unquantified variables satisfies every clause
+    for s in product([0, 1], repeat=n - len(X)):
+        Y = tuple(X) + s
+        if all(any(Y[v - 1] if v > 0 else not Y[-v - 1] for v in clause) for clause in clauses):
+            return True
+    return False
+
+
+class TestPhi(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        rng = random.Random(1)
+        for seed in range(50):
+            n = rng.randint(2, 8)
+            clauses = _random_3cnf(n, rng.randint(1, 30), seed=seed)
+            cnf = CNF(clauses, list(range(1, rng.randint(1, n) + 1)), n=n)
+            for X in product([0, 1], repeat=len(cnf.ind)):
+                self.assertEqual(cnf.phi(X), _brute_phi(clauses, n, X))
+
+    def test_large_cnf_memory_is_bounded(self):
+        # 40k clauses with 12 unquantified variables used to allocate gigabytes
+        n, k = 60, 12
+        plant = [random.Random(2).randint(0, 1) for _ in range(n)]
+        ind = list(range(1, n - k + 1))
+
+        for clauses, expected in [(_random_3cnf(n, 40000, plant=plant), True),
+                                  (_random_3cnf(n, 40000) + [[-1], [1]], False)]:
+            cnf = CNF(clauses, ind, n=n)
+            tracemalloc.start()
+            try:
+                self.assertEqual(cnf.phi(tuple(plant[:n - k])), expected)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            self.assertLess(peak, 64 * 2 ** 20)
+
+
+class TestParseCNF(unittest.TestCase):
+
+    def _parse(self, text):
+        fd, path = tempfile.mkstemp(suffix='.cnf')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(text)
+            return parse_cnf(path)
+        finally:
+            os.remove(path)
+
+    def test_satlib_trailer(self):
+        cnf = self._parse('c comment\np cnf 3 2\n 1 -3 0\n2 3 -1 0\n%\n0\n\n')
+        self.assertEqual(cnf.clauses, ((1, -3), (2, 3, -1)))
+
+    def test_clause_spanning_lines(self):
+        cnf = self._parse('p cnf 3 2\nc ind 1 2 0\n1 -3\n 0 2 0\n')
+        self.assertEqual(cnf.clauses, ((1, -3), (2,)))
+        self.assertEqual(cnf.ind, [1, 2])
+
+    def test_unterminated_last_clause_raises(self):
+        with self.assertRaisesRegex(ValueError, 'not terminated'):
+            self._parse('p cnf 4 2\n1 -2 0\n3 4\n')
+
+    def test_literal_out_of_range_raises(self):
+        for literal in ['99999999999', '-2147483648', '99999999999999999999']:
+            with self.assertRaisesRegex(ValueError, 'out of range'):
+                self._parse('p cnf 1 1\n%s 0\n' % literal)
+
+    def test_bad_token_raises(self):
+        with self.assertRaisesRegex(ValueError, "'x'"):
+            self._parse('p cnf 3 2\n1 x 0\n2 0\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import random
+import unittest
+
+from relnet.graph_parser import Graph
+from relnet.weighted_to_unweighted import _weighted_edge, float2bin, weighted2unweighted
+
+
+def _expand(g):
+    # Reference: straight per-edge expansion with _weighted_edge
+    vertex_counter = g.n
+    E_new = []
+    P_new = []
+    for (head, tail), p in zip(g.E, g.P):
+        b = float2bin(1 - p) if p > 0 else [True]
+        e_new, vertex_counter = _weighted_edge(b, head, tail, vertex_counter)
+        E_new.extend(e_new)
+        P_new.extend([0.5 if p > 0 else 1.0] * len(e_new))
+    return list(range(vertex_counter)), E_new, P_new
+
+
+class TestWeightedEdge(unittest.TestCase):
+
+    def test_bits(self):
+        # Set bits join to the tail, zero bits open a new vertex
+        self.assertEqual(_weighted_edge([True, False, True], 0, 1, 3), ([(0, 1), (0, 4), (4, 1)], 4))
+
+    def test_skips_tail(self):
+        self.assertEqual(_weighted_edge([False, True], 0, 4, 3), ([(0, 5), (5, 4)], 5))
+
+
+class TestWeighted2Unweighted(unittest.TestCase):
+
+    def _check(self, g):
+        ug = weighted2unweighted(g)
+        self.assertEqual((ug.V, ug.E, ug.P), _expand(g))
+        self.assertEqual(ug.K, g.K)
+
+    def test_contiguous_ids(self):
+        # 0.375 down is 0.101 up (a zero bit); 0.0 down is a single set bit
+        V = [0, 1, 2, 3]
+        E = [(0, 1), (0, 2), (1, 3), (2, 3)]
+        self.assertLessEqual(max(tail for _, tail in E), len(V))
+        self._check(Graph(V, [0, 3], E, [0.5, 0.375, 0.0, 1 / 3]))
+
+    def test_non_contiguous_ids(self):
+        # Tails above g.n take the edge by edge path, where new vertices skip the tail
+        V = [0, 1, 5, 9]
+        E = [(0, 5), (5, 9), (1, 9), (0, 1)]
+        self.assertGreater(max(tail for _, tail in E), len(V))
+        self._check(Graph(V, [0, 9], E, [0.375, 0.0, 0.9, 0.5]))
+
+    def test_random_graphs(self):
+        rng = random.Random(0)
+        for t in range(200):
+            n = rng.randint(2, 12)
+            E = [tuple(rng.sample(range(n), 2)) for _ in range(rng.randint(0, 20))]
+            V = sorted({v for e in E for v in e}) if t % 2 else list(range(n))
+            P = [rng.choice([0.0, 0.5, 0.375, rng.random()]) for _ in E]
+            self._check(Graph(V, rng.sample(range(n), 2), E, P))
+
+
+if __name__ == '__main__':
+    unittest.main()